@@ -0,0 +1,141 @@
+"""
+Helpers for running grading requests through the OpenAI Batch API.
+
+Batch jobs are cheaper than interactive requests but may take up to 24 hours,
+so the batch id is persisted to disk and a restarted run resumes polling the
+same job instead of submitting a new one.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, Any, Optional
+import orjson
+from openai import AsyncOpenAI
+from openai.types import Batch
+from retries import call_with_retries
+
+# --- CONSTANTS ---
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+POLL_INTERVAL_SECONDS = 30
+TERMINAL_BATCH_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+logger = logging.getLogger(__name__)
+
+
+def load_batch_id(state_path: str, input_hash: str) -> Optional[str]:
+    """Returns the batch id saved by a previous run for the same input, if any.
+
+    A saved batch that was submitted for a different input hash (for example
+    an edited transcript) is ignored.
+    """
+    try:
+        with open(state_path, "rb") as f:
+            state = orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except orjson.JSONDecodeError:
+        logger.warning("Ignoring unreadable batch state file: %s", state_path)
+        return None
+    if not isinstance(state, dict) or state.get("input_hash") != input_hash:
+        logger.warning(
+            "Ignoring batch state %s because it was saved for a different input.",
+            state_path,
+        )
+        return None
+    return state.get("batch_id")
+
+
+def save_batch_id(state_path: str, batch_id: str, input_hash: str):
+    """Persists the batch id so an interrupted run can resume polling it."""
+    with open(state_path, "wb") as f:
+        f.write(orjson.dumps({"batch_id": batch_id, "input_hash": input_hash}))
+
+
+def clear_batch_id(state_path: str):
+    """Removes the persisted batch id once its results have been consumed."""
+    try:
+        os.remove(state_path)
+    except FileNotFoundError:
+        pass
+
+
+async def submit_batch(client: AsyncOpenAI, requests: Dict[str, Dict[str, Any]]) -> str:
+    """Uploads one chat completion request per custom id and starts a batch job."""
+    lines = [
+        orjson.dumps(
+            {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": body,
+            }
+        )
+        for custom_id, body in requests.items()
+    ]
+    batch_file = await call_with_retries(
+        client.files.create,
+        file=("grading_batch.jsonl", b"\n".join(lines)),
+        purpose="batch",
+    )
+    batch = await call_with_retries(
+        client.batches.create,
+        input_file_id=batch_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=BATCH_COMPLETION_WINDOW,
+    )
+    logger.info("Batch %s submitted with %s requests.", batch.id, len(lines))
+    return batch.id
+
+
+async def poll_batch(
+    client: AsyncOpenAI, batch_id: str, poll_interval: float = POLL_INTERVAL_SECONDS
+) -> Batch:
+    """Waits until the batch job reaches a terminal status and returns it."""
+    while True:
+        batch = await call_with_retries(client.batches.retrieve, batch_id)
+        if batch.status in TERMINAL_BATCH_STATUSES:
+            return batch
+        counts = batch.request_counts
+        progress = f" ({counts.completed}/{counts.total} done)" if counts else ""
+        logger.info("Batch %s is %s%s, waiting...", batch_id, batch.status, progress)
+        await asyncio.sleep(poll_interval)
+
+
+async def _download_records(client: AsyncOpenAI, file_id: Optional[str]):
+    """Downloads a batch output or error file and yields its JSONL records."""
+    if not file_id:
+        return
+    output = await call_with_retries(client.files.content, file_id)
+    for line in output.content.splitlines():
+        if line.strip():
+            yield orjson.loads(line)
+
+
+async def collect_results(client: AsyncOpenAI, batch: Batch) -> Dict[str, str]:
+    """Downloads a finished batch and returns the message content per custom id.
+
+    Requests that failed inside the batch, whether listed in the output file or
+    in the batch's error file, are logged and left out of the result.
+    """
+    results: Dict[str, str] = {}
+    async for record in _download_records(client, batch.output_file_id):
+        custom_id = record["custom_id"]
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            logger.error(
+                "Batch request %s failed: %s",
+                custom_id,
+                record.get("error") or response,
+            )
+            continue
+        results[custom_id] = response["body"]["choices"][0]["message"]["content"]
+    async for record in _download_records(client, batch.error_file_id):
+        response = record.get("response") or {}
+        logger.error(
+            "Batch request %s failed: %s",
+            record["custom_id"],
+            record.get("error") or response.get("body") or response,
+        )
+    return results
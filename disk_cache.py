@@ -0,0 +1,142 @@
+"""
+An exact-match on-disk cache for chat completion responses.
+
+Responses are stored as JSON files named after the SHA-256 hash of the request
+(model, messages, response format and sampling parameters), so re-running the
+script with the same rubric and transcript makes no API calls. Bump
+PROMPT_VERSION to invalidate all existing entries.
+"""
+
+import hashlib
+import os
+import time
+from typing import Callable, Dict, Any, Optional
+import httpx
+import orjson
+from openai import AsyncOpenAI
+from retries import call_with_retries, call_with_retries_except_timeouts
+
+# --- CONSTANTS ---
+PROMPT_VERSION = 1
+CACHE_DIR = os.path.join(".cache", "llm")
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+def make_cache_key(request: Dict[str, Any]) -> str:
+    """Hashes the parts of a chat completion request that determine its output.
+
+    Besides the model, messages and response format, sampling parameters such
+    as temperature are part of the key.
+    """
+    key_data = {"prompt_version": PROMPT_VERSION, **request}
+    serialized = orjson.dumps(key_data, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(serialized).hexdigest()
+
+
+def _cache_path(key: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, key[:2], f"{key}.json")
+
+
+def get_cached_content(
+    key: str, cache_dir: str = CACHE_DIR, ttl_seconds: float = DEFAULT_TTL_SECONDS
+) -> Optional[str]:
+    """Returns the cached response content for the key, unless missing or expired."""
+    try:
+        with open(_cache_path(key, cache_dir), "rb") as f:
+            entry = orjson.loads(f.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return None
+    if time.time() - entry.get("created_at", 0) > ttl_seconds:
+        return None
+    return entry.get("content")
+
+
+def remove_content(key: str, cache_dir: str = CACHE_DIR):
+    """Deletes the entry for the key, if there is one."""
+    try:
+        os.remove(_cache_path(key, cache_dir))
+    except FileNotFoundError:
+        pass
+
+
+def _get_valid_content(
+    key: str, validate: Optional[Callable[[str], bool]]
+) -> Optional[str]:
+    """Returns the cached content for the key, removing it if validate rejects it."""
+    content = get_cached_content(key)
+    if content is not None and validate is not None and not validate(content):
+        remove_content(key)
+        return None
+    return content
+
+
+def get_cached_response(
+    request: Dict[str, Any], validate: Optional[Callable[[str], bool]] = None
+) -> Optional[str]:
+    """Returns the cached response content for a request without calling the API.
+
+    An entry rejected by validate is removed, so the request is sent again.
+    """
+    return _get_valid_content(make_cache_key(request), validate)
+
+
+def store_content(key: str, content: str, cache_dir: str = CACHE_DIR):
+    """Writes the response content for the key, replacing any previous entry."""
+    path = _cache_path(key, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(orjson.dumps({"created_at": time.time(), "content": content}))
+    os.replace(temp_path, path)
+
+
+def is_cacheable(
+    request: Dict[str, Any], content: Optional[str], finish_reason: Optional[str]
+) -> bool:
+    """Checks that the content is worth caching.
+
+    Only complete (finish_reason "stop"), non-empty responses are cached, and
+    they must be valid JSON if JSON was requested.
+    """
+    if not content or finish_reason != "stop":
+        return False
+    response_format = request.get("response_format") or {}
+    if response_format.get("type") not in ("json_object", "json_schema"):
+        return True
+    try:
+        orjson.loads(content)
+    except orjson.JSONDecodeError:
+        return False
+    return True
+
+
+async def cached_chat_completion(
+    client: AsyncOpenAI,
+    timeout: Optional[httpx.Timeout] = None,
+    validate: Optional[Callable[[str], bool]] = None,
+    retry_timeouts: bool = True,
+    **request: Any,
+) -> str:
+    """Returns the message content for a chat completion, using the disk cache.
+
+    Accepts the same keyword arguments as client.chat.completions.create. The
+    optional timeout overrides the client's default for this call and is not
+    part of the cache key. If validate is given, only content it accepts is
+    cached, and a cached entry it rejects is dropped and requested again.
+    Transient API errors are retried before the request is given up on;
+    timeouts only if retry_timeouts is set.
+    """
+    key = make_cache_key(request)
+    content = _get_valid_content(key, validate)
+    if content is not None:
+        return content
+    options = {} if timeout is None else {"timeout": timeout}
+    call = call_with_retries if retry_timeouts else call_with_retries_except_timeouts
+    response = await call(client.chat.completions.create, **request, **options)
+    choice = response.choices[0]
+    content = choice.message.content
+    if is_cacheable(request, content, choice.finish_reason) and (
+        validate is None or validate(content)
+    ):
+        store_content(key, content)
+    return content
@@ -4,88 +4,246 @@ to grade the interview, and writes the results to a JSON file.
 """
 
 import argparse
-import json
+import asyncio
+import functools
+import hashlib
+import logging
+import logging.handlers
+import queue
 import sys
 import os
-import time
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
-from openai import OpenAI, APIError
-from dotenv import load_dotenv
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Type
+import httpx
+import orjson
+from openai import AsyncOpenAI, APIError
+from pydantic import BaseModel, Field, ValidationError
+import batch_runner
+import disk_cache
 
 # --- CONSTANTS ---
 EXTRACTION_MODEL = "gpt-4o"
-GRADING_MODEL = "gpt-3.5-turbo"
-ANALYSIS_MODEL = "gpt-3.5-turbo"
+GRADING_MODEL = "gpt-4o-mini"
+ANALYSIS_MODEL = "gpt-4o-mini"
+MAX_CONCURRENT_REQUESTS = 10
+MAX_CONCURRENT_TRANSCRIPTS = 20
+MAX_CONNECTIONS = 50
+DNS_CACHE_TTL_SECONDS = 300
+KEEPALIVE_TIMEOUT_SECONDS = 60
+REQUEST_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+# The single-request call has no output cap and can run for minutes on a long
+# transcript, so it gets a longer read timeout than REQUEST_TIMEOUT.
+SINGLE_SHOT_TIMEOUT = httpx.Timeout(300.0, connect=5.0)
+BATCH_STATE_SUFFIX = ".batch_id"
+GRADING_MAX_TOKENS = 128
+ANALYSIS_MAX_TOKENS = 300
+LOG_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+# This script's own loggers log at INFO; everything else stays at WARNING.
+APP_LOGGERS = (__name__, "batch_runner", "semantic_cache")
+
+
+class Grade(BaseModel):
+    """The score and comment given to a single interview answer."""
+
+    score: int = Field(ge=0, le=100)
+    comment: str
+
+
+def strict_model_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Builds a strict structured-output schema from a Pydantic model.
+
+    Pydantic's titles and descriptions are left out; the field types and
+    constraints are kept, so the schema cannot drift from the validator.
+    """
+    schema = model.model_json_schema()
+    return {
+        "type": "object",
+        "properties": {
+            name: {key: value for key, value in field.items() if key != "title"}
+            for name, field in schema["properties"].items()
+        },
+        "required": schema["required"],
+        "additionalProperties": False,
+    }
+
+
+GRADE_SCHEMA = strict_model_schema(Grade)
+
+
+logger = logging.getLogger(__name__)
 
 # --- CORE FUNCTIONS ---
 
 
+def object_schema(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds a strict JSON schema object in which every property is required."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def json_schema_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Wraps a JSON schema as a strict structured-output response format."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": schema},
+    }
+
+
 def parse_arguments() -> argparse.Namespace:
     """Parses command-line arguments."""
     parser = argparse.ArgumentParser(
         description="Grades an interview transcript using an LLM."
     )
     parser.add_argument("--rubric", required=True, help="Path to the rubric JSON file.")
-    parser.add_argument(
+    transcript_group = parser.add_mutually_exclusive_group(required=True)
+    transcript_group.add_argument(
         "--transcript",
-        required=True,
         help="Path to the interview transcript text file.",
     )
+    transcript_group.add_argument(
+        "--transcripts-dir",
+        help="Path to a directory of transcript .txt files to grade in one run.",
+    )
     parser.add_argument(
-        "--output", required=True, help="Path to write the output analysis JSON file."
+        "--output",
+        required=True,
+        help="Path to write the output analysis JSON file (a directory with --transcripts-dir).",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Grade answers through the OpenAI Batch API (cheaper, but may take hours).",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write the output JSON without indentation.",
     )
     return parser.parse_args()
 
 
-def setup_api_client() -> OpenAI:
-    """Loads API key from .env and sets up the OpenAI client."""
-    load_dotenv()
+def create_http_client() -> httpx.AsyncClient:
+    """Creates an aiohttp-backed HTTP client with a pooled TCP connector.
+
+    The aiohttp session is created lazily on the first request, so it is bound
+    to the running event loop and shared by every call made through the client.
+    """
+    import aiohttp
+    from httpx_aiohttp import AiohttpTransport
+    from openai import DefaultAioHttpClient
+
+    transport = AiohttpTransport(
+        client=lambda: aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=MAX_CONNECTIONS,
+                ttl_dns_cache=DNS_CACHE_TTL_SECONDS,
+                keepalive_timeout=KEEPALIVE_TIMEOUT_SECONDS,
+            )
+        )
+    )
+    return DefaultAioHttpClient(transport=transport, timeout=REQUEST_TIMEOUT)
+
+
+def setup_api_client() -> AsyncOpenAI:
+    """Loads API key from .env (unless already set) and sets up the OpenAI client.
+
+    The client and its connection pool are meant to be created once and shared
+    by every LLM call in the process. The SDK's own retries are disabled because
+    transient errors are retried by the retries module.
+    """
+    if "OPENAI_API_KEY" not in os.environ:
+        from dotenv import load_dotenv
+
+        load_dotenv(override=False)
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
-        print("ERROR: OPENAI_API_KEY environment variable not found.", file=sys.stderr)
+        logger.error("OPENAI_API_KEY environment variable not found.")
         sys.exit(1)
-    return OpenAI(api_key=api_key)
+    return AsyncOpenAI(
+        api_key=api_key,
+        http_client=create_http_client(),
+        timeout=REQUEST_TIMEOUT,
+        max_retries=0,
+    )
 
 
 def load_json_file(filepath: str) -> List[Dict[str, Any]]:
     """Reads a JSON file and returns its content."""
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(filepath, "rb") as f:
+            return orjson.loads(f.read())
     except FileNotFoundError:
-        print(f"ERROR: File not found: {filepath}", file=sys.stderr)
+        logger.error("File not found: %s", filepath)
         sys.exit(1)
-    except json.JSONDecodeError:
-        print(
-            f"ERROR: The file is not a valid JSON: {filepath}",
-            file=sys.stderr,
-        )
+    except orjson.JSONDecodeError:
+        logger.error("The file is not a valid JSON: %s", filepath)
         sys.exit(1)
 
 
-def load_transcript(filepath: str) -> str:
-    """Reads a transcript text file."""
-    try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
-        print(f"ERROR: File not found: {filepath}", file=sys.stderr)
-        sys.exit(1)
+@functools.lru_cache(maxsize=8)
+def _rubric_prompt_block(
+    rubric_path: str, mtime: float, include_examples: bool = False
+) -> str:
+    """Serializes the rubric's questions for prompts, memoized per file version.
 
+    The modification time is part of the cache key, so an edited rubric is
+    serialized again. With include_examples the full rubric items are kept.
+    """
+    rubric = load_json_file(rubric_path)
+    if include_examples:
+        return orjson.dumps(rubric).decode()
+    return serialize_questions(rubric)
 
-def extract_answers_with_llm(
-    client: OpenAI, rubric: List[Dict], transcript: str
-) -> Optional[List[Dict]]:
-    """Extracts answers for each question from the transcript using an LLM."""
-    print("Extracting answers with LLM... (This may take a moment)")
 
+def serialize_questions(rubric: List[Dict]) -> str:
+    """Serializes the question ids and texts of a rubric as a JSON list."""
     questions_list = [
         {"id": item["id"], "question_text": item["text"]} for item in rubric
     ]
+    return orjson.dumps(questions_list).decode()
+
+
+def build_transcript_prompt(questions_block: str, transcript: str) -> str:
+    """Builds the {"questions", "transcript"} JSON prompt around a serialized block."""
+    transcript_json = orjson.dumps(transcript).decode()
+    return f'{{"questions": {questions_block}, "transcript": {transcript_json}}}'
+
+
+def load_transcript(filepath: str) -> Optional[str]:
+    """Reads a transcript text file, returning None if it cannot be read."""
+    try:
+        return Path(filepath).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        logger.error("File not found: %s", filepath)
+    except UnicodeDecodeError:
+        logger.error("The transcript is not valid UTF-8 text: %s", filepath)
+    return None
+
+
+async def extract_answers_with_llm(
+    client: AsyncOpenAI,
+    rubric: List[Dict],
+    transcript: str,
+    questions_block: Optional[str] = None,
+) -> Optional[List[Dict]]:
+    """Extracts answers for each question from the transcript using an LLM.
+
+    questions_block is the pre-serialized question list; it is built from the
+    rubric when not given.
+    """
+    logger.info("Extracting answers with LLM... (This may take a moment)")
+
+    if questions_block is None:
+        questions_block = serialize_questions(rubric)
 
     system_prompt = """
     Sen bir metin işleme uzmanısın. Görevin, sana verilen bir mülakat transkripti ve bir soru listesini analiz etmektir.
+    Girdi, "questions" (soru listesi) ve "transcript" (mülakat transkripti) alanlarını içeren bir JSON objesidir.
     JSON formatındaki soru listesindeki her bir soru için, adayın transkriptteki cevabını bulup çıkarman gerekiyor.
     Çıktın SADECE ve SADECE aşağıdaki formatta bir JSON objesi olmalıdır. Başka hiçbir metin veya açıklama ekleme.
     {
@@ -95,26 +253,25 @@ def extract_answers_with_llm(
     }
     Eğer bir soruya cevap bulamazsan veya cevap çok kısaysa, değer olarak "Cevap bulunamadı veya yetersiz." yaz.
     """
-    user_prompt = f"""
-    Soru Listesi (JSON formatında):
-    {json.dumps(questions_list, indent=2, ensure_ascii=False)}
-
-    Mülakat Transkripti:
-    ---
-    {transcript}
-    ---
-    """
+    user_prompt = build_transcript_prompt(questions_block, transcript)
 
     try:
-        response = client.chat.completions.create(
+        content = await disk_cache.cached_chat_completion(
+            client,
             model=EXTRACTION_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ],
-            response_format={"type": "json_object"},
+            response_format=json_schema_format(
+                "extracted_answers",
+                object_schema(
+                    {f"{item['id']}_answer": {"type": "string"} for item in rubric}
+                ),
+            ),
+            temperature=0,
         )
-        extracted_answers_json = json.loads(response.choices[0].message.content)
+        extracted_answers_json = orjson.loads(content)
         qa_pairs = []
         for item in rubric:
             answer_key = f"{item['id']}_answer"
@@ -129,25 +286,22 @@ def extract_answers_with_llm(
                     "rubric_examples": item["examples"],
                 }
             )
-        print("Answers successfully extracted.")
+        logger.info("Answers successfully extracted.")
         return qa_pairs
     except APIError as e:
-        print(
-            f"ERROR: An OpenAI API error occurred during answer extraction: {e}",
-            file=sys.stderr,
-        )
+        logger.error("An OpenAI API error occurred during answer extraction: %s", e)
         return None
-    except json.JSONDecodeError:
-        print(
-            "ERROR: The response from the LLM for extraction was not valid JSON.",
-            file=sys.stderr,
-        )
+    except orjson.JSONDecodeError:
+        logger.error("The response from the LLM for extraction was not valid JSON.")
         return None
 
 
-def grade_single_answer(client: OpenAI, qa_pair: Dict) -> Dict[str, Any]:
-    """Grades a single question-answer pair against the rubric."""
-    print(f"Grading question {qa_pair['id']}...")
+def build_grading_request(qa_pair: Dict) -> Dict[str, Any]:
+    """Builds the chat completion request body for grading a single answer.
+
+    The question and its rubric examples come before the candidate's answer, so
+    requests for the same question share a prompt prefix that OpenAI can cache.
+    """
     system_prompt = """
     Sen uzman bir işe alım yöneticisisin. Görevin, bir adayın mülakat sorusuna verdiği cevabı, sağlanan "great", "alright" ve "bad" cevap örneklerine göre değerlendirmektir.
     Değerlendirmenin sonucunda, çıktın SADECE ve SADECE aşağıdaki formatta bir JSON objesi olmalıdır:
@@ -159,99 +313,504 @@ def grade_single_answer(client: OpenAI, qa_pair: Dict) -> Dict[str, Any]:
     user_prompt = f"""
     Mülakat Sorusu: {qa_pair['text']}
     ---
-    Adayın Cevabı: {qa_pair['answer']}
-    ---
     Değerlendirme Kriterleri (Örnek Cevaplar):
     - "great": {qa_pair['rubric_examples']['great']}
     - "alright": {qa_pair['rubric_examples']['alright']}
     - "bad": {qa_pair['rubric_examples']['bad']}
+    ---
+    Adayın Cevabı: {qa_pair['answer']}
+    """
+    return {
+        "model": GRADING_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        "response_format": json_schema_format("grade", GRADE_SCHEMA),
+        "max_tokens": GRADING_MAX_TOKENS,
+        "temperature": 0,
+    }
+
+
+def grade_cache_key(qa_pair: Dict) -> str:
+    """Hashes everything besides the answer that determines a single-answer grade.
+
+    Cached grades are only reused under the same key, so changing the question,
+    its rubric examples, the grading model or the prompt version invalidates them.
+    """
+    key_data = {
+        "prompt_version": disk_cache.PROMPT_VERSION,
+        "model": GRADING_MODEL,
+        "question_id": qa_pair["id"],
+        "question_text": qa_pair["text"],
+        "rubric_examples": qa_pair["rubric_examples"],
+    }
+    serialized = orjson.dumps(key_data, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(serialized).hexdigest()
+
+
+async def grade_single_answer(client: AsyncOpenAI, qa_pair: Dict) -> Dict[str, Any]:
+    """Grades a single question-answer pair against the rubric.
+
+    An exact repeat of the grading request is answered from the disk cache
+    first. Otherwise grades for identical or semantically similar answers to
+    the same question and rubric are served from the semantic cache instead of
+    calling the grading model.
+    """
+    logger.info("Grading question %s...", qa_pair["id"])
+    request = build_grading_request(qa_pair)
+    cached_content = disk_cache.get_cached_response(
+        request, validate=is_valid_grade_json
+    )
+    if cached_content is not None:
+        return Grade.model_validate_json(cached_content).model_dump()
+
+    # Imported here so that FAISS and NumPy are only loaded when a per-question
+    # grade is not already cached on disk.
+    import semantic_cache
+
+    cache = semantic_cache.get_grade_cache()
+    cache_key = grade_cache_key(qa_pair)
+    vector = None
+    try:
+        cached_grade, vector = await cache.lookup(client, cache_key, qa_pair["answer"])
+        if cached_grade is not None:
+            logger.info("Using cached grade for question %s.", qa_pair["id"])
+            return cached_grade
+    except APIError as e:
+        logger.warning(
+            "Semantic cache lookup failed for question %s: %s", qa_pair["id"], e
+        )
+    try:
+        content = await disk_cache.cached_chat_completion(
+            client, validate=is_valid_grade_json, **request
+        )
+        grade = Grade.model_validate_json(content).model_dump()
+        if vector is not None:
+            cache.add(cache_key, qa_pair["answer"], vector, grade)
+        return grade
+    except APIError as e:
+        logger.error(
+            "An API error occurred while grading question %s: %s", qa_pair["id"], e
+        )
+        return {"score": 0, "comment": "An API error occurred during grading."}
+    except ValidationError:
+        logger.error(
+            "The grading response for question %s was not a valid grade.", qa_pair["id"]
+        )
+        return {"score": 0, "comment": "A format error occurred during grading."}
+
+
+def is_valid_grade_json(content: str) -> bool:
+    """Checks that a grading response decodes to a valid grade."""
+    try:
+        Grade.model_validate_json(content)
+    except ValidationError:
+        return False
+    return True
+
+
+async def grade_answers_concurrently(
+    client: AsyncOpenAI, qa_pairs: List[Dict]
+) -> Dict[str, Dict[str, Any]]:
+    """Grades all question-answer pairs concurrently, bounded by a semaphore.
+
+    Grades are collected as they complete rather than in question order.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def grade_with_limit(qa_pair: Dict) -> Tuple[str, Dict[str, Any]]:
+        async with semaphore:
+            return qa_pair["id"], await grade_single_answer(client, qa_pair)
+
+    graded_results: Dict[str, Dict[str, Any]] = {}
+    for next_grade in asyncio.as_completed(
+        [grade_with_limit(pair) for pair in qa_pairs]
+    ):
+        question_id, grade = await next_grade
+        graded_results[question_id] = grade
+        logger.info("Graded %s/%s questions.", len(graded_results), len(qa_pairs))
+    return {pair["id"]: graded_results[pair["id"]] for pair in qa_pairs}
+
+
+def parse_grade(grade: Any) -> Optional[Dict[str, Any]]:
+    """Validates a decoded grade object, returning it as a plain dict or None."""
+    try:
+        return Grade.model_validate(grade).model_dump()
+    except ValidationError:
+        return None
+
+
+async def grade_all_answers(
+    client: AsyncOpenAI, qa_pairs: List[Dict]
+) -> Dict[str, Dict[str, Any]]:
+    """Grades all question-answer pairs in a single LLM call.
+
+    Questions whose grade is missing or malformed in the response are re-graded
+    individually with grade_single_answer.
     """
+    logger.info("Grading all answers in a single request...")
+    system_prompt = """
+    Sen uzman bir işe alım yöneticisisin. Görevin, bir adayın birden fazla mülakat sorusuna verdiği cevapları, her soru için sağlanan "great", "alright" ve "bad" cevap örneklerine göre değerlendirmektir.
+    Girdi, "questions" (sorular ve değerlendirme kriterleri) ve "answers" (soru kimliğine göre adayın cevapları) alanlarını içeren bir JSON objesidir.
+    Her soruyu yalnızca kendi değerlendirme kriterlerine göre, diğer sorulardan bağımsız olarak puanla.
+    Değerlendirmenin sonucunda, çıktın SADECE ve SADECE soru kimliklerini anahtar olarak kullanan aşağıdaki formatta bir JSON objesi olmalıdır:
+    {
+      "q1": {
+        "score": <0 ile 100 arasında bir tam sayı (integer)>,
+        "comment": "<Puanı gerekçelendiren 1-2 cümlelik kısa ve profesyonel bir yorum>"
+      },
+      "q2": {...}
+    }
+    """
+    # The rubric part is identical across candidates, so it goes before the
+    # answers to keep a cacheable prompt prefix.
+    user_prompt = orjson.dumps(
+        {
+            "questions": [
+                {
+                    "id": pair["id"],
+                    "question_text": pair["text"],
+                    "rubric_examples": pair["rubric_examples"],
+                }
+                for pair in qa_pairs
+            ],
+            "answers": {pair["id"]: pair["answer"] for pair in qa_pairs},
+        }
+    ).decode()
+    graded_results: Dict[str, Dict[str, Any]] = {}
     try:
-        response = client.chat.completions.create(
+        content = await disk_cache.cached_chat_completion(
+            client,
             model=GRADING_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ],
-            response_format={"type": "json_object"},
+            response_format=json_schema_format(
+                "grades", object_schema({pair["id"]: GRADE_SCHEMA for pair in qa_pairs})
+            ),
+            max_tokens=GRADING_MAX_TOKENS * len(qa_pairs),
+            temperature=0,
         )
-        grade = json.loads(response.choices[0].message.content)
-        return grade
+        grades = orjson.loads(content)
+        if isinstance(grades, dict):
+            for pair in qa_pairs:
+                grade = parse_grade(grades.get(pair["id"]))
+                if grade is not None:
+                    graded_results[pair["id"]] = grade
     except APIError as e:
-        print(
-            f"ERROR: An API error occurred while grading question {qa_pair['id']}: {e}",
-            file=sys.stderr,
-        )
-        return {"score": 0, "comment": "An API error occurred during grading."}
-    except json.JSONDecodeError:
-        print(
-            f"ERROR: The grading response for question {qa_pair['id']} was not valid JSON.",
-            file=sys.stderr,
+        logger.error("An API error occurred while grading all answers: %s", e)
+    except orjson.JSONDecodeError:
+        logger.error("The combined grading response was not valid JSON.")
+
+    missing_pairs = [pair for pair in qa_pairs if pair["id"] not in graded_results]
+    if missing_pairs:
+        logger.info(
+            "Falling back to individual grading for: %s",
+            ", ".join(pair["id"] for pair in missing_pairs),
         )
-        return {"score": 0, "comment": "A format error occurred during grading."}
+        graded_results.update(await grade_answers_concurrently(client, missing_pairs))
+    return {pair["id"]: graded_results[pair["id"]] for pair in qa_pairs}
 
 
-def generate_overall_analysis(client: OpenAI, results: Dict) -> str:
+async def generate_overall_analysis(client: AsyncOpenAI, results: Dict) -> str:
     """Generates an overall analysis based on all scores and comments."""
-    print("Generating overall analysis...")
+    logger.info("Generating overall analysis...")
     system_prompt = "Sen kıdemli bir işe alım direktörüsün. Sana bir mülakattaki sorulara verilen puanlar ve yorumlar sunulacak. Görevin, bu verilere dayanarak adayın genel performansı hakkında kısa, özetleyici ve profesyonel bir analiz paragrafı yazmaktır."
-    user_prompt = f"Mülakat Sonuçları:\n{json.dumps(results, indent=2, ensure_ascii=False)}\n\nLütfen bu sonuçlara dayanarak genel bir analiz yaz."
+    user_prompt = f"Mülakat Sonuçları:\n{orjson.dumps(results).decode()}\n\nLütfen bu sonuçlara dayanarak genel bir analiz yaz."
     try:
-        response = client.chat.completions.create(
+        content = await disk_cache.cached_chat_completion(
+            client,
             model=ANALYSIS_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ],
+            max_tokens=ANALYSIS_MAX_TOKENS,
+            temperature=0,
         )
-        return response.choices[0].message.content
+        return content
     except APIError as e:
-        print(
-            f"ERROR: An API error occurred during overall analysis generation: {e}",
-            file=sys.stderr,
-        )
+        logger.error("An API error occurred during overall analysis generation: %s", e)
         return "An API error occurred while generating the overall analysis."
 
 
-def write_output_file(filepath: str, data: Dict):
-    """Writes the final results to the specified output file."""
+async def grade_interview_single_shot(
+    client: AsyncOpenAI,
+    rubric: List[Dict],
+    transcript: str,
+    rubric_block: Optional[str] = None,
+) -> Optional[Tuple[Dict[str, Dict[str, Any]], str]]:
+    """Extracts, grades and analyses the whole interview in a single LLM call.
+
+    rubric_block is the pre-serialized rubric, built from rubric when not given.
+    Returns the per-question grades and the overall analysis, or None if the
+    response is unusable and the multi-step pipeline should be used instead.
+    """
+    logger.info("Grading the interview in a single request...")
+    system_prompt = """
+    Sen uzman bir işe alım yöneticisisin. Sana bir mülakat transkripti ve her soru için "great", "alright" ve "bad" cevap örneklerini içeren bir değerlendirme listesi verilecek.
+    Girdi, "questions" (soru listesi ve değerlendirme kriterleri) ve "transcript" (mülakat transkripti) alanlarını içeren bir JSON objesidir. Görevin üç adımdan oluşur:
+    1. Listedeki her soru için, adayın transkriptteki cevabını bulup çıkar. Cevap bulamazsan veya cevap çok kısaysa, cevap olarak "Cevap bulunamadı veya yetersiz." yaz.
+    2. Her cevabı yalnızca o sorunun örnek cevaplarına göre 0 ile 100 arasında bir tam sayı (integer) ile puanla ve puanı 1-2 cümlelik kısa ve profesyonel bir yorumla gerekçelendir.
+    3. Tüm puan ve yorumlara dayanarak adayın genel performansı hakkında kısa, özetleyici ve profesyonel bir analiz paragrafı yaz.
+    Çıktın SADECE ve SADECE aşağıdaki formatta bir JSON objesi olmalıdır. Başka hiçbir metin veya açıklama ekleme.
+    {
+      "questions": {
+        "q1": {
+          "answer": "Adayın 1. soruya verdiği cevap metni...",
+          "score": <0 ile 100 arasında bir tam sayı (integer)>,
+          "comment": "<Puanı gerekçelendiren yorum>"
+        },
+        "q2": {...}
+      },
+      "overall_analysis": "<Genel analiz paragrafı>"
+    }
+    """
+    if rubric_block is None:
+        rubric_block = orjson.dumps(rubric).decode()
+    user_prompt = build_transcript_prompt(rubric_block, transcript)
+
+    def is_valid_response(content: str) -> bool:
+        return parse_interview_grades(content, rubric) is not None
+
     try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        print(f"\nAnalysis successfully written to '{filepath}'.")
-    except IOError as e:
-        print(
-            f"ERROR: An I/O error occurred while writing the output file: {e}",
-            file=sys.stderr,
+        content = await disk_cache.cached_chat_completion(
+            client,
+            model=EXTRACTION_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            response_format=json_schema_format(
+                "interview_grades",
+                object_schema(
+                    {
+                        "questions": object_schema(
+                            {
+                                item["id"]: object_schema(
+                                    {
+                                        "answer": {"type": "string"},
+                                        **GRADE_SCHEMA["properties"],
+                                    }
+                                )
+                                for item in rubric
+                            }
+                        ),
+                        "overall_analysis": {"type": "string"},
+                    }
+                ),
+            ),
+            temperature=0,
+            timeout=SINGLE_SHOT_TIMEOUT,
+            # A timed-out attempt is not repeated: the multi-step pipeline
+            # is the fallback.
+            retry_timeouts=False,
+            validate=is_valid_response,
         )
+    except APIError as e:
+        logger.error("An API error occurred during single-request grading: %s", e)
+        return None
 
+    result = parse_interview_grades(content, rubric)
+    if result is None:
+        logger.error(
+            "The single-request grading response did not match the expected format."
+        )
+        return None
+    logger.info("Interview successfully graded in a single request.")
+    return result
 
-def main():
-    """Main function to run the interview grading script."""
-    args = parse_arguments()
-    print("--- Step 1: Initializing and Reading Files ---")
-    client = setup_api_client()
-    rubric_data = load_json_file(args.rubric)
-    transcript_data = load_transcript(args.transcript)
-    print("\n--- Step 2: Extracting Question-Answer Pairs ---")
-    qa_pairs = extract_answers_with_llm(client, rubric_data, transcript_data)
+
+def parse_interview_grades(
+    content: str, rubric: List[Dict]
+) -> Optional[Tuple[Dict[str, Dict[str, Any]], str]]:
+    """Parses a single-request grading response into grades and the analysis.
+
+    Returns None unless the response is JSON with a valid grade for every
+    rubric question and a string analysis.
+    """
+    try:
+        result = orjson.loads(content)
+    except orjson.JSONDecodeError:
+        return None
+    questions = result.get("questions") if isinstance(result, dict) else None
+    overall_analysis = result.get("overall_analysis") if questions else None
+    if not isinstance(questions, dict) or not isinstance(overall_analysis, str):
+        return None
+    graded_results = {}
+    for item in rubric:
+        grade = parse_grade(questions.get(item["id"]))
+        if grade is None:
+            return None
+        graded_results[item["id"]] = grade
+    return graded_results, overall_analysis
+
+
+async def grade_interview_multi_step(
+    client: AsyncOpenAI,
+    rubric: List[Dict],
+    transcript: str,
+    questions_block: Optional[str] = None,
+) -> Optional[Tuple[Dict[str, Dict[str, Any]], str]]:
+    """Grades the interview with separate extraction, grading and analysis calls.
+
+    Returns None if the answers could not be extracted.
+    """
+    qa_pairs = await extract_answers_with_llm(
+        client, rubric, transcript, questions_block
+    )
     if not qa_pairs:
-        print(
-            "Processing stopped because answers could not be extracted.",
-            file=sys.stderr,
+        logger.error("Processing stopped because answers could not be extracted.")
+        return None
+    graded_results = await grade_all_answers(client, qa_pairs)
+    overall_analysis = await generate_overall_analysis(client, graded_results)
+    return graded_results, overall_analysis
+
+
+async def grade_interview_batch(
+    client: AsyncOpenAI,
+    rubric: List[Dict],
+    transcript: str,
+    state_path: str,
+    questions_block: Optional[str] = None,
+) -> Optional[Tuple[Dict[str, Dict[str, Any]], str]]:
+    """Grades the interview answers through the OpenAI Batch API.
+
+    The batch id is stored at state_path together with a hash of the rubric and
+    transcript, so a restarted run on the same input resumes the pending batch
+    instead of extracting and submitting everything again. Questions whose
+    batch request failed are re-graded individually. Returns None if the
+    answers could not be extracted or the batch failed.
+    """
+    input_hash = hashlib.sha256(orjson.dumps([rubric, transcript])).hexdigest()
+    qa_pairs = None
+    batch_id = batch_runner.load_batch_id(state_path, input_hash)
+    if batch_id:
+        logger.info("Resuming pending batch %s...", batch_id)
+    else:
+        qa_pairs = await extract_answers_with_llm(
+            client, rubric, transcript, questions_block
         )
-        sys.exit(1)
-    print("\n--- Step 3: Grading Individual Answers ---")
+        if not qa_pairs:
+            logger.error("Processing stopped because answers could not be extracted.")
+            return None
+        batch_id = await batch_runner.submit_batch(
+            client, {pair["id"]: build_grading_request(pair) for pair in qa_pairs}
+        )
+        batch_runner.save_batch_id(state_path, batch_id, input_hash)
+
+    batch = await batch_runner.poll_batch(client, batch_id)
+    if batch.status != "completed":
+        batch_runner.clear_batch_id(state_path)
+        logger.error("Batch %s finished with status '%s'.", batch_id, batch.status)
+        return None
+    contents = await batch_runner.collect_results(client, batch)
+    batch_runner.clear_batch_id(state_path)
+
     graded_results = {}
-    total_score = 0
-    for pair in qa_pairs:
-        grade = grade_single_answer(client, pair)
-        graded_results[pair["id"]] = grade
-        total_score += grade.get("score", 0)
-        time.sleep(1)
-    print("\n--- Step 4: Finalizing Results ---")
-    overall_score = total_score / len(qa_pairs) if qa_pairs else 0
-    overall_analysis = generate_overall_analysis(client, graded_results)
+    for item in rubric:
+        if item["id"] not in contents:
+            logger.error("The batch returned no grade for question %s.", item["id"])
+            continue
+        try:
+            graded_results[item["id"]] = Grade.model_validate_json(
+                contents[item["id"]]
+            ).model_dump()
+        except ValidationError:
+            logger.error(
+                "The grading response for question %s was not a valid grade.",
+                item["id"],
+            )
+
+    missing_ids = [item["id"] for item in rubric if item["id"] not in graded_results]
+    if missing_ids:
+        logger.info(
+            "Falling back to individual grading for: %s", ", ".join(missing_ids)
+        )
+        if qa_pairs is None:
+            # Resumed batches skip extraction; the disk cache usually makes
+            # this repeat of the original extraction request free.
+            qa_pairs = await extract_answers_with_llm(
+                client, rubric, transcript, questions_block
+            )
+            if not qa_pairs:
+                logger.error(
+                    "Processing stopped because answers could not be extracted."
+                )
+                return None
+        graded_results.update(
+            await grade_answers_concurrently(
+                client, [pair for pair in qa_pairs if pair["id"] in missing_ids]
+            )
+        )
+    graded_results = {item["id"]: graded_results[item["id"]] for item in rubric}
+    overall_analysis = await generate_overall_analysis(client, graded_results)
+    return graded_results, overall_analysis
+
+
+def write_output_file(filepath: str, data: Dict, compact: bool = False):
+    """Writes the final results to the specified output file.
+
+    The output is indented for readability unless compact is set.
+    """
+    option = orjson.OPT_NON_STR_KEYS
+    if not compact:
+        option |= orjson.OPT_INDENT_2
+    try:
+        with open(filepath, "wb") as f:
+            f.write(orjson.dumps(data, option=option))
+        logger.info("Analysis successfully written to '%s'.", filepath)
+    except IOError as e:
+        logger.error("An I/O error occurred while writing the output file: %s", e)
+
+
+async def process_transcript(
+    client: AsyncOpenAI,
+    args: argparse.Namespace,
+    rubric_data: List[Dict],
+    rubric_mtime: float,
+    transcript_path: str,
+    output_path: str,
+) -> bool:
+    """Grades one transcript and writes its analysis file.
+
+    Returns False if the transcript could not be read or graded.
+    """
+    transcript_data = load_transcript(transcript_path)
+    if transcript_data is None:
+        return False
+    questions_block = _rubric_prompt_block(args.rubric, rubric_mtime)
+    logger.info("--- Step 2: Grading the Interview (%s) ---", transcript_path)
+    if args.batch:
+        result = await grade_interview_batch(
+            client,
+            rubric_data,
+            transcript_data,
+            output_path + BATCH_STATE_SUFFIX,
+            questions_block,
+        )
+    else:
+        result = await grade_interview_single_shot(
+            client,
+            rubric_data,
+            transcript_data,
+            _rubric_prompt_block(args.rubric, rubric_mtime, include_examples=True),
+        )
+        if result is None:
+            logger.info(
+                "Falling back to step-by-step extraction, grading and analysis..."
+            )
+            result = await grade_interview_multi_step(
+                client, rubric_data, transcript_data, questions_block
+            )
+    if result is None:
+        return False
+    graded_results, overall_analysis = result
+    logger.info("--- Step 3: Finalizing Results (%s) ---", transcript_path)
+    total_score = sum(grade.get("score", 0) for grade in graded_results.values())
+    overall_score = total_score / len(graded_results) if graded_results else 0
     final_output = {
         "questions": graded_results,
         "overall_score": round(overall_score, 2),
@@ -260,9 +819,119 @@ def main():
         .isoformat(timespec="seconds")
         .replace("+00:00", "Z"),
     }
-    print("\n--- Step 5: Writing Output File ---")
-    write_output_file(args.output, final_output)
-    print("\nProcessing complete! ✨")
+    logger.info("--- Step 4: Writing Output File (%s) ---", transcript_path)
+    write_output_file(output_path, final_output, args.compact)
+    return True
+
+
+async def run(args: argparse.Namespace):
+    """Runs the full grading pipeline for the parsed command-line arguments.
+
+    In directory mode the client and the parsed rubric are shared by all
+    transcripts, which are graded concurrently. A transcript that fails with
+    an unexpected error is logged and counted as failed without stopping the
+    others.
+    """
+    logger.info("--- Step 1: Initializing and Reading Files ---")
+    client = setup_api_client()
+    rubric_data = load_json_file(args.rubric)
+    rubric_mtime = os.path.getmtime(args.rubric)
+    if args.transcripts_dir:
+        transcript_paths = sorted(Path(args.transcripts_dir).glob("*.txt"))
+        if not transcript_paths:
+            logger.error("No .txt transcripts found in: %s", args.transcripts_dir)
+            sys.exit(1)
+        if os.path.exists(args.output) and not os.path.isdir(args.output):
+            logger.error(
+                "The output path must be a directory with --transcripts-dir: %s",
+                args.output,
+            )
+            sys.exit(1)
+        os.makedirs(args.output, exist_ok=True)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_TRANSCRIPTS)
+
+        async def process_with_limit(transcript_path: Path) -> bool:
+            async with semaphore:
+                try:
+                    return await process_transcript(
+                        client,
+                        args,
+                        rubric_data,
+                        rubric_mtime,
+                        str(transcript_path),
+                        os.path.join(args.output, f"{transcript_path.stem}.json"),
+                    )
+                except Exception:
+                    logger.exception("Grading failed for %s", transcript_path)
+                    return False
+
+        async with client:
+            results = await asyncio.gather(
+                *(process_with_limit(path) for path in transcript_paths)
+            )
+        failed = [
+            str(path)
+            for path, succeeded in zip(transcript_paths, results)
+            if not succeeded
+        ]
+    else:
+        async with client:
+            succeeded = await process_transcript(
+                client, args, rubric_data, rubric_mtime, args.transcript, args.output
+            )
+        failed = [] if succeeded else [args.transcript]
+    if failed:
+        logger.error("Processing stopped for: %s", ", ".join(failed))
+        sys.exit(1)
+    logger.info("Processing complete! ✨")
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records as they are, leaving all formatting to the listener.
+
+    The queue never leaves this process, so records need not be made
+    picklable. The log arguments used here are not mutated after logging.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging() -> logging.handlers.QueueListener:
+    """Sends log records through a queue to a background listener thread.
+
+    Coroutines only enqueue records, so they never block on console writes
+    or spend time formatting messages. Info messages from this script's
+    loggers go to stdout and warnings or errors from any logger to stderr.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    stdout_handler = logging.StreamHandler(sys.stdout)
+    stdout_handler.setFormatter(formatter)
+    stdout_handler.addFilter(lambda record: record.levelno < logging.WARNING)
+    stderr_handler = logging.StreamHandler(sys.stderr)
+    stderr_handler.setFormatter(formatter)
+    stderr_handler.setLevel(logging.WARNING)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    logging.basicConfig(level=logging.WARNING, handlers=[queue_handler])
+    for name in APP_LOGGERS:
+        logging.getLogger(name).setLevel(logging.INFO)
+    listener = logging.handlers.QueueListener(
+        log_queue, stdout_handler, stderr_handler, respect_handler_level=True
+    )
+    listener.start()
+    return listener
+
+
+def main():
+    """Main function to run the interview grading script."""
+    args = parse_arguments()
+    listener = configure_logging()
+    try:
+        asyncio.run(run(args))
+    finally:
+        listener.stop()
 
 
 # --- SCRIPT ENTRY POINT ---
@@ -0,0 +1,72 @@
+"""
+Retry policy for transient OpenAI API failures.
+
+Timeouts, connection errors, rate limits and server errors are retried with
+randomized exponential backoff. Any other API error is raised immediately, and
+the last error is re-raised once the attempts run out so callers can fall back
+to their usual error handling. Calls that already have a long timeout and a
+fallback path can use call_with_retries_except_timeouts instead.
+"""
+
+from typing import Awaitable, Callable, TypeVar
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    retry_if_not_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+# --- CONSTANTS ---
+MAX_ATTEMPTS = 5
+MIN_WAIT_SECONDS = 1
+MAX_WAIT_SECONDS = 30
+RETRYABLE_ERRORS = (
+    APITimeoutError,
+    APIConnectionError,
+    RateLimitError,
+    InternalServerError,
+)
+
+T = TypeVar("T")
+
+retry_transient_errors = retry(
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    wait=wait_random_exponential(min=MIN_WAIT_SECONDS, max=MAX_WAIT_SECONDS),
+    stop=stop_after_attempt(MAX_ATTEMPTS),
+    reraise=True,
+)
+
+# APITimeoutError is a subclass of APIConnectionError, so it has to be excluded
+# explicitly.
+retry_transient_errors_except_timeouts = retry(
+    retry=retry_if_exception_type(RETRYABLE_ERRORS)
+    & retry_if_not_exception_type(APITimeoutError),
+    wait=wait_random_exponential(min=MIN_WAIT_SECONDS, max=MAX_WAIT_SECONDS),
+    stop=stop_after_attempt(MAX_ATTEMPTS),
+    reraise=True,
+)
+
+
+@retry_transient_errors
+async def call_with_retries(func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+    """Awaits func(*args, **kwargs), retrying it on transient API errors.
+
+    SDK methods are wrapped in plain functions that return coroutines, so the
+    retry decorator cannot be applied to them directly.
+    """
+    return await func(*args, **kwargs)
+
+
+@retry_transient_errors_except_timeouts
+async def call_with_retries_except_timeouts(
+    func: Callable[..., Awaitable[T]], *args, **kwargs
+) -> T:
+    """Like call_with_retries, but raises APITimeoutError without retrying."""
+    return await func(*args, **kwargs)
@@ -0,0 +1,198 @@
+"""
+A persistent semantic cache for single-answer grades.
+
+Each graded answer is embedded and stored in a FAISS inner product index over
+L2-normalized vectors, so a search score is the cosine similarity. Grades
+themselves live in a JSONL sidecar file whose line number is the FAISS
+embedding id. Each record also keeps its embedding, so the index can be rebuilt
+from the records when the two files disagree, for example after two runs
+flushed the cache at the same time. Every record carries the caller's grading key (a hash of the
+question, rubric, model and prompt version), and only hits with the same key
+are returned. Exact repeats of a text are answered from memory without calling
+the embeddings endpoint at all. New grades are kept in memory and written to
+disk by flush(), which runs once at interpreter exit.
+"""
+
+import atexit
+import base64
+import functools
+import logging
+import os
+from typing import Dict, Any, List, Optional, Tuple
+import faiss
+import numpy as np
+import orjson
+from openai import AsyncOpenAI
+from retries import retry_transient_errors
+
+# --- CONSTANTS ---
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536
+SIMILARITY_THRESHOLD = 0.92
+CACHE_DIR = ".cache"
+INDEX_FILENAME = "grades.faiss"
+RECORDS_FILENAME = "grades.jsonl"
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticGradeCache:
+    """Stores grades on disk and looks them up by exact or similar text."""
+
+    def __init__(
+        self, cache_dir: str = CACHE_DIR, threshold: float = SIMILARITY_THRESHOLD
+    ):
+        self.threshold = threshold
+        self.index_path = os.path.join(cache_dir, INDEX_FILENAME)
+        self.records_path = os.path.join(cache_dir, RECORDS_FILENAME)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.records: List[Dict[str, Any]] = self._load_records()
+        self.index = self._load_index()
+        if self.index.ntotal != len(self.records):
+            logger.warning(
+                "The semantic cache index and records are out of sync; rebuilding the index from the records."
+            )
+            self._rebuild_index()
+        self.exact: Dict[Tuple[Optional[str], str], int] = {
+            (record.get("key"), record["text"]): embedding_id
+            for embedding_id, record in enumerate(self.records)
+        }
+        self.pending: List[Dict[str, Any]] = []
+
+    def _load_records(self) -> List[Dict[str, Any]]:
+        records = []
+        try:
+            with open(self.records_path, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(orjson.loads(line))
+                    except orjson.JSONDecodeError:
+                        logger.warning("Skipping a corrupt semantic cache record.")
+        except FileNotFoundError:
+            pass
+        return records
+
+    def _load_index(self) -> faiss.Index:
+        if os.path.exists(self.index_path):
+            return faiss.read_index(self.index_path)
+        return faiss.IndexFlatIP(EMBEDDING_DIMENSIONS)
+
+    def _rebuild_index(self):
+        """Rebuilds the index from the records' embeddings and rewrites both files.
+
+        Records written before embeddings were stored cannot be indexed and
+        are dropped.
+        """
+        self.records = [record for record in self.records if "vector" in record]
+        self.index = faiss.IndexFlatIP(EMBEDDING_DIMENSIONS)
+        if self.records:
+            self.index.add(
+                np.stack([_decode_vector(record["vector"]) for record in self.records])
+            )
+        _replace_file(
+            self.records_path,
+            b"".join(orjson.dumps(record) + b"\n" for record in self.records),
+        )
+        self._write_index()
+
+    def _write_index(self):
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        faiss.write_index(self.index, temp_path)
+        os.replace(temp_path, self.index_path)
+
+    def get_exact(self, key: str, text: str) -> Optional[Dict[str, Any]]:
+        """Returns the grade stored for exactly this key and text, if any."""
+        embedding_id = self.exact.get((key, text))
+        if embedding_id is None:
+            return None
+        return orjson.loads(self.records[embedding_id]["grade_json"])
+
+    @retry_transient_errors
+    async def embed(self, client: AsyncOpenAI, text: str) -> np.ndarray:
+        """Embeds the text and returns it as a normalized (1, dim) float32 array."""
+        response = await client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+        vector = np.array([response.data[0].embedding], dtype="float32")
+        faiss.normalize_L2(vector)
+        return vector
+
+    def search(self, key: str, vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Returns the closest stored grade with this key if it is similar enough."""
+        if self.index.ntotal == 0:
+            return None
+        _, scores, ids = self.index.range_search(vector, self.threshold)
+        for embedding_id in ids[np.argsort(-scores)]:
+            record = self.records[int(embedding_id)]
+            if record.get("key") == key:
+                return orjson.loads(record["grade_json"])
+        return None
+
+    async def lookup(
+        self, client: AsyncOpenAI, key: str, text: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+        """Looks up a grade by exact text, then by semantic similarity.
+
+        Only grades stored under the same key are considered. Returns the
+        cached grade (or None) and the text's embedding, so that a miss can be
+        stored with add() without embedding the text again.
+        """
+        grade = self.get_exact(key, text)
+        if grade is not None:
+            return grade, None
+        vector = await self.embed(client, text)
+        return self.search(key, vector), vector
+
+    def add(self, key: str, text: str, vector: np.ndarray, grade: Dict[str, Any]):
+        """Stores a new grade in memory; flush() persists it."""
+        embedding_id = self.index.ntotal
+        record = {
+            "key": key,
+            "text": text,
+            "grade_json": orjson.dumps(grade).decode(),
+            "vector": _encode_vector(vector[0]),
+        }
+        self.index.add(vector)
+        self.records.append(record)
+        self.pending.append(record)
+        self.exact[(key, text)] = embedding_id
+
+    def flush(self):
+        """Appends the pending records and rewrites the index file once.
+
+        The records are appended in a single write. If another run flushed in
+        the meantime, the index written here no longer matches the records
+        and the next load rebuilds it.
+        """
+        if not self.pending:
+            return
+        with open(self.records_path, "ab") as f:
+            f.write(b"".join(orjson.dumps(record) + b"\n" for record in self.pending))
+        self._write_index()
+        self.pending = []
+
+
+def _encode_vector(vector: np.ndarray) -> str:
+    return base64.b64encode(vector.astype("float32").tobytes()).decode()
+
+
+def _decode_vector(encoded: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(encoded), dtype="float32")
+
+
+def _replace_file(path: str, data: bytes):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+@functools.lru_cache(maxsize=None)
+def get_grade_cache() -> SemanticGradeCache:
+    """Returns the process-wide grade cache, loading it from disk on first use.
+
+    The cache is flushed to disk when the interpreter exits.
+    """
+    cache = SemanticGradeCache()
+    atexit.register(cache.flush)
+    return cache